@@ -0,0 +1,45 @@
+"""store chat context slugs as text array
+
+Revision ID: 7d2c9a4f1b30
+Revises: c41f7d2a9e86
+Create Date: 2026-10-15 15:21:09.402517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2c9a4f1b30'
+down_revision: Union[str, Sequence[str], None] = 'c41f7d2a9e86'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Postgres disallows subqueries in ALTER ... USING, so convert through a
+    # temporary column instead of altering the type in place.
+    op.add_column('chat_messages', sa.Column('context_slugs_arr', postgresql.ARRAY(sa.Text()), nullable=True))
+    op.execute(
+        "UPDATE chat_messages SET context_slugs_arr = "
+        "ARRAY(SELECT json_array_elements_text(context_slugs)) "
+        "WHERE context_slugs IS NOT NULL"
+    )
+    op.drop_column('chat_messages', 'context_slugs')
+    op.alter_column('chat_messages', 'context_slugs_arr', new_column_name='context_slugs')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column(
+        'chat_messages',
+        'context_slugs',
+        type_=sa.JSON(),
+        postgresql_using='array_to_json(context_slugs)',
+        existing_type=postgresql.ARRAY(sa.Text()),
+        existing_nullable=True,
+    )
@@ -0,0 +1,37 @@
+"""add hnsw index on docs embedding
+
+Revision ID: c41f7d2a9e86
+Revises: 3b8e51c0d7a2
+Create Date: 2026-10-15 14:03:27.884105
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41f7d2a9e86'
+down_revision: Union[str, Sequence[str], None] = '3b8e51c0d7a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Requires pgvector >= 0.5.0
+    op.create_index(
+        'ix_docs_embedding_hnsw',
+        'docs',
+        ['embedding'],
+        unique=False,
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={'embedding': 'vector_cosine_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_docs_embedding_hnsw', table_name='docs', postgresql_using='hnsw')
@@ -20,7 +20,8 @@ app = FastAPI(title="TACOS API", description="Ted's AI Chatbot & Obsidian Sync")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    listener_thread = start_listener()
+    # Edited notes must not keep being answered from this worker's prompt cache
+    listener_thread = start_listener(on_docs_changed=rag.get_prompt_cache().clear)
     logger.info("CouchDB listener started in background thread")
 
     try:
@@ -1,7 +1,6 @@
 import uuid
 
 from sqlalchemy import (
-    JSON,
     BigInteger,
     CheckConstraint,
     Column,
@@ -12,6 +11,7 @@ from sqlalchemy import (
     UUID,
     func,
 )
+from sqlalchemy.dialects.postgresql import ARRAY
 
 from app.db.postgres.base import Base
 
@@ -24,7 +24,7 @@ class ChatMessage(Base):
     seq = Column(Integer, nullable=False)
     role = Column(Text, nullable=False)
     content = Column(Text, nullable=False)
-    context_slugs = Column(JSON, nullable=True)
+    context_slugs = Column(ARRAY(Text), nullable=True)
     created_at = Column(
         DateTime(timezone=True),
         nullable=False,
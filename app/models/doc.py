@@ -1,7 +1,7 @@
 import uuid
 
 from pgvector.sqlalchemy import Vector
-from sqlalchemy import JSON, UUID, Column, DateTime, Text, func
+from sqlalchemy import JSON, UUID, Column, DateTime, Index, Text, func
 
 from app.db.postgres.base import Base
 
@@ -25,3 +25,13 @@ class Doc(Base):
         server_default=func.now(),
         index=True,
     )
+
+    __table_args__ = (
+        Index(
+            "ix_docs_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+    )
@@ -0,0 +1,17 @@
+from sqlalchemy import CHAR, Column, DateTime, LargeBinary, Text, func
+
+from app.db.postgres.base import Base
+
+
+class CachedEmbedding(Base):
+    __tablename__ = "embedding_cache"
+
+    hash = Column(CHAR(64), primary_key=True)  # sha256 of the embedded text
+    provider = Column(Text, primary_key=True)
+    model = Column(Text, primary_key=True)
+    vector = Column(LargeBinary, nullable=False)  # float32 bytes
+    created_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+    )
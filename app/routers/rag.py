@@ -1,26 +1,53 @@
 import logging
+import re
+import threading
 import uuid
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.requests import ClientDisconnect
 from sqlalchemy.orm import Session
 
 from app.db.couchdb import get_couch
-from app.db.postgres.base import get_db
+from app.db.postgres.base import SessionLocal, get_db
 from app.schemas.doc import DocResult
 from app.schemas.rag import PromptRequest, UpdateContentRequest, UpdateContentResponse
 from app.services.chat_logger import ChatLogger
 from app.services.docs_ingester import ingest_all
-from app.services.rag_service import RAGService
+from app.services.embedding_cache import EmbeddingCache
+from app.services.prompt_cache import CachedPrompt, ProximityCache
+from app.services.rag_service import STREAM_ERROR_MESSAGE, RAGService
 from app.settings import settings
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+_prompt_cache = ProximityCache(
+    capacity=settings.RAG_PROMPT_CACHE_SIZE,
+    ttl=settings.RAG_PROMPT_CACHE_TTL_SECONDS,
+)
 
-def get_rag_service(db: Session = Depends(get_db)) -> RAGService:
-    return RAGService(db, api_key=settings.OPENAI_API_KEY)
+_UUID_RE = re.compile(
+    r"\A[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\Z"
+)
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    return EmbeddingCache(SessionLocal)
+
+
+def get_rag_service(
+    db: Session = Depends(get_db),
+    embedding_cache: EmbeddingCache = Depends(get_embedding_cache),
+) -> RAGService:
+    return RAGService(
+        db,
+        api_key=settings.OPENAI_API_KEY,
+        embed_text_fn=embedding_cache.embed_text,
+    )
 
 
 def get_chat_logger(db: Session = Depends(get_db)) -> ChatLogger:
@@ -32,6 +59,32 @@ def get_ingest_all():
     return ingest_all
 
 
+def get_prompt_cache() -> ProximityCache:
+    """Provide the process-wide prompt cache for dependency override in tests."""
+    return _prompt_cache
+
+
+async def _stream_cached_reply(text: str):
+    yield text
+
+
+class _BackgroundOnDisconnectResponse(StreamingResponse):
+    """
+    StreamingResponse that also runs its background task when the client
+    disconnects under ASGI spec >= 2.4, where Starlette raises ClientDisconnect
+    and skips it. Older specs already run it after a disconnect. Either way the
+    task runs inside the request scope, before get_db closes the session.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        except ClientDisconnect:
+            if self.background is not None:
+                await self.background()
+            raise
+
+
 @router.post("/prompt")
 async def prompt_rag(
     request: PromptRequest,
@@ -39,6 +92,7 @@ async def prompt_rag(
     threshold: float = Query(0.25, ge=0.0, le=1.0, description="Similarity threshold"),
     rag_service: RAGService = Depends(get_rag_service),
     chat_logger: ChatLogger = Depends(get_chat_logger),
+    prompt_cache: ProximityCache = Depends(get_prompt_cache),
     chat_id_header: Optional[str] = Header(
         default=None, alias="X-Chat-Id", convert_underscores=False
     ),
@@ -54,66 +108,136 @@ async def prompt_rag(
         logger.debug(f"Received prompt request with {len(request.messages)} messages.")
 
         # Determine session and context (prefer body, then header, else create)
-        try:
-            provided_chat = request.chat_id or (
-                uuid.UUID(chat_id_header) if chat_id_header else None
-            )
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid X-Chat-Id header")
+        provided_chat = request.chat_id
+        if provided_chat is None and chat_id_header:
+            # Validate the canonical form up front so parsing can't fail
+            if not _UUID_RE.match(chat_id_header):
+                raise HTTPException(status_code=400, detail="Invalid X-Chat-Id header")
+            provided_chat = uuid.UUID(chat_id_header)
         chat_id = chat_logger.ensure_chat_id(provided_chat)
         latest_user_message = request.messages[-1].content
 
-        relevant_docs = rag_service.get_relevant_documents_with_navigation(
-            query=latest_user_message, limit=limit, threshold=threshold
+        # Serve near-identical queries from the prompt cache, skipping retrieval.
+        # Embedding and retrieval block on network IO, so run them in the
+        # threadpool instead of on the event loop that serves the stream.
+        query_embedding = await run_in_threadpool(
+            rag_service.embed_query, latest_user_message
+        )
+        # Entries are scoped by retrieval parameters so a different limit or
+        # threshold neither hits nor shadows another query's entry.
+        cache_scope = (limit, threshold)
+        cached = prompt_cache.lookup(
+            query_embedding,
+            tau=settings.RAG_PROMPT_CACHE_MAX_DISTANCE,
+            scope=cache_scope,
         )
+
+        if cached is not None:
+            relevant_docs = cached.relevant_docs
+        else:
+            relevant_docs = await run_in_threadpool(
+                rag_service.get_relevant_documents_with_navigation,
+                query=latest_user_message,
+                limit=limit,
+                threshold=threshold,
+                embedding=query_embedding,
+            )
         context_slugs = [doc.slug for doc in relevant_docs if doc.slug]
+        # Nothing is written until the stream ends, so end the read transaction
+        # now; otherwise the pooled connection sits idle in transaction for the
+        # whole LLM stream.
+        await run_in_threadpool(chat_logger.db.rollback)
+
+        # Replies depend on the whole conversation, so only first turns reuse them
+        reuse_reply = len(request.messages) == 1
+        if cached is not None and reuse_reply and cached.assistant_text:
+            streamer = _stream_cached_reply(cached.assistant_text)
+        else:
+            # Stream assistant reply while buffering to save after stream completes.
+            # stream_chat_response keeps the system prompt and chat history as a
+            # byte-identical prefix (context and the latest question go last) so
+            # the provider's prompt caching applies; keep dynamic values out of it.
+            streamer = rag_service.stream_chat_response(
+                messages=request.messages,
+                limit=limit,
+                threshold=threshold,
+                relevant_docs=relevant_docs,
+            )
 
-        # Persist the user turn
-        next_seq = chat_logger.next_sequence(chat_id)
-        chat_logger.log_message(
-            chat_id=chat_id,
-            role="user",
-            seq=next_seq,
-            content=latest_user_message,
-            context_slugs=context_slugs,
-        )
-        chat_logger.db.commit()
-
-        # Stream assistant reply while buffering to save after stream completes
-        streamer = rag_service.stream_chat_response(
-            messages=request.messages,
-            limit=limit,
-            threshold=threshold,
-            relevant_docs=relevant_docs,
-        )
+        assistant_chunks = []
+        persisted = False
+        persist_lock = threading.Lock()
+
+        def persist_chat_turns():
+            """Save the user turn and reply in one transaction, at most once."""
+            nonlocal persisted
+            with persist_lock:
+                if persisted:
+                    return
+                persisted = True
+            assistant_message = "".join(assistant_chunks).strip()
+            try:
+                # The user turn's sequence number is assigned by the INSERT
+                user_seq = chat_logger.log_message(
+                    chat_id=chat_id,
+                    role="user",
+                    content=latest_user_message,
+                    context_slugs=context_slugs,
+                )
+                if assistant_message:
+                    chat_logger.log_message(
+                        chat_id=chat_id,
+                        role="assistant",
+                        seq=user_seq + 1,
+                        content=assistant_message,
+                        context_slugs=context_slugs,
+                    )
+                chat_logger.db.commit()
+            except Exception as log_error:
+                chat_logger.db.rollback()
+                logger.error(
+                    f"Failed to log chat messages: {log_error}",
+                    exc_info=True,
+                )
 
         async def streaming_wrapper():
-            assistant_chunks = []
+            completed = False
             try:
                 async for chunk in streamer:
                     if chunk is not None:
                         assistant_chunks.append(chunk)
                         yield chunk
+                completed = True
             finally:
                 assistant_message = "".join(assistant_chunks).strip()
-                if assistant_message:
-                    try:
-                        chat_logger.log_message(
-                            chat_id=chat_id,
-                            role="assistant",
-                            seq=next_seq + 1,
-                            content=assistant_message,
-                            context_slugs=context_slugs,
-                        )
-                        chat_logger.db.commit()
-                    except Exception as log_error:
-                        chat_logger.db.rollback()
-                        logger.error(
-                            f"Failed to log assistant message: {log_error}",
-                            exc_info=True,
-                        )
-
-        response = StreamingResponse(streaming_wrapper(), media_type="text/plain")
+                if cached is None:
+                    cacheable_reply = (
+                        reuse_reply
+                        and completed
+                        and assistant_message
+                        and STREAM_ERROR_MESSAGE.strip() not in assistant_message
+                    )
+                    prompt_cache.insert(
+                        query_embedding,
+                        CachedPrompt(
+                            relevant_docs=relevant_docs,
+                            assistant_text=(
+                                assistant_message if cacheable_reply else None
+                            ),
+                        ),
+                        scope=cache_scope,
+                        tau=settings.RAG_PROMPT_CACHE_MAX_DISTANCE,
+                    )
+
+        # Persisting runs as a background task once the stream ends (or the
+        # client disconnects), so the DB writes stay off the client-visible
+        # latency and the event loop. It still runs inside the request scope,
+        # before get_db closes the session.
+        response = _BackgroundOnDisconnectResponse(
+            streaming_wrapper(),
+            media_type="text/plain",
+            background=BackgroundTask(persist_chat_turns),
+        )
         response.headers["X-Chat-Id"] = str(chat_id)
         return response
 
@@ -139,6 +263,8 @@ def reingest(
     db: Session = Depends(get_db),
     couch=Depends(get_couch),
     ingest_all_fn=Depends(get_ingest_all),
+    embedding_cache: EmbeddingCache = Depends(get_embedding_cache),
+    prompt_cache: ProximityCache = Depends(get_prompt_cache),
 ):
     """
     Full ingestion/reset endpoint.
@@ -146,7 +272,9 @@ def reingest(
     """
     try:
         couch_db, parser = couch
-        ingest_all_fn(db, parser=parser)
+        # Chunks whose enhanced text is unchanged reuse their cached embedding
+        ingest_all_fn(db, parser=parser, embed_texts_fn=embedding_cache.embed_texts)
+        prompt_cache.clear()
         return {"status": "success", "message": "ingestion completed."}
     except Exception as e:
         logger.error(f"Reset ingest failed: {e}", exc_info=True)
@@ -200,6 +328,7 @@ def truncate(text: str | None, length: int) -> str | None:
 def update_portfolio_content(
     request: UpdateContentRequest,
     rag_service: RAGService = Depends(get_rag_service),
+    prompt_cache: ProximityCache = Depends(get_prompt_cache),
 ):
     """
     Update portfolio content with complete replacement strategy.
@@ -212,6 +341,7 @@ def update_portfolio_content(
 
         # Update portfolio content
         stats = rag_service.update_portfolio_content(request.content)
+        prompt_cache.clear()
 
         return UpdateContentResponse(
             processed=stats["processed"],
@@ -1,7 +1,7 @@
 import uuid
 from typing import List, Optional
 
-from sqlalchemy import func
+from sqlalchemy import func, insert, select
 from sqlalchemy.orm import Session
 
 from app.models.chat import ChatMessage
@@ -17,27 +17,34 @@ class ChatLogger:
     def ensure_chat_id(self, chat_id: Optional[uuid.UUID]) -> uuid.UUID:
         return chat_id or uuid.uuid4()
 
-    def next_sequence(self, chat_id: uuid.UUID) -> int:
-        last_seq = (
-            self.db.query(func.max(self.chat_model.seq))
-            .filter(self.chat_model.chat_id == chat_id)
-            .scalar()
-        )
-        return (last_seq or 0) + 1
-
     def log_message(
         self,
         chat_id: uuid.UUID,
         role: str,
-        seq: int,
         content: str,
         context_slugs: Optional[List[str]] = None,
-    ) -> None:
-        message = self.chat_model(
-            chat_id=chat_id,
-            seq=seq,
-            role=role,
-            content=content,
-            context_slugs=context_slugs,
+        seq: Optional[int] = None,
+    ) -> int:
+        """
+        Insert a chat turn and return its sequence number.
+        Without an explicit seq, the next one is assigned inside the INSERT itself,
+        saving a separate MAX() round-trip.
+        """
+        if seq is None:
+            seq = (
+                select(func.coalesce(func.max(self.chat_model.seq), 0) + 1)
+                .where(self.chat_model.chat_id == chat_id)
+                .scalar_subquery()
+            )
+        stmt = (
+            insert(self.chat_model)
+            .values(
+                chat_id=chat_id,
+                seq=seq,
+                role=role,
+                content=content,
+                context_slugs=context_slugs,
+            )
+            .returning(self.chat_model.seq)
         )
-        self.db.add(message)
+        return self.db.execute(stmt).scalar_one()
@@ -1,9 +1,14 @@
-import json
 import logging
+import queue
+import re
 import threading
+import time
+from datetime import timedelta
+from functools import lru_cache, partial
 from typing import Callable
 
 import httpx
+import orjson
 from sqlalchemy.orm import Session
 
 from app.db.couchdb import get_couch
@@ -11,72 +16,134 @@ from app.db.postgres.base import SessionLocal
 from app.models.doc import Doc
 from app.repos.last_seq_repo import LastSeqRepo
 from app.services.docs_ingester import ingest_doc
+from app.services.embedding_cache import EmbeddingCache
 from app.services.revalidate_posts import RevalidatePostsService
 from app.settings import Settings, settings
 
 logger = logging.getLogger(__name__)
 
 STOP_LISTENER_EVENT = threading.Event()  # thread-safe shutdown signal
+# Bounded so a stalled revalidation endpoint can't grow memory without limit
+REVALIDATE_QUEUE: "queue.Queue[str | None]" = queue.Queue(maxsize=256)
 
 
-def listen_changes():
+class SeqCheckpoint:
+    """
+    Batches last_seq writes so a burst of changes costs one commit per
+    `every` changes (or per `interval` seconds) instead of one per change.
+    """
+
+    def __init__(
+        self,
+        seq_repo: LastSeqRepo,
+        *,
+        every: int = 50,
+        interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.seq_repo = seq_repo
+        self.every = every
+        self.interval = interval
+        self.clock = clock
+        self.pending_seq: str | None = None
+        self.pending_count = 0
+        self.last_flush = clock()
+
+    def record(self, seq: str) -> None:
+        self.pending_seq = seq
+        self.pending_count += 1
+        self.maybe_flush()
+
+    def maybe_flush(self) -> None:
+        if self.pending_seq is None:
+            return
+        if (
+            self.pending_count >= self.every
+            or self.clock() - self.last_flush >= self.interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        if self.pending_seq is not None:
+            self.seq_repo.update_last_seq(self.pending_seq)
+        self.pending_seq = None
+        self.pending_count = 0
+        self.last_flush = self.clock()
+
+
+def listen_changes(on_docs_changed: Callable[[], None] | None = None):
     logger.info("CouchDB listener thread started")
     backoff = 1
+    # Edits usually touch a few chunks; the rest reuse their cached embeddings.
+    # Idle heartbeats also prune the cache, which every query embedding lands in.
+    embedding_cache = EmbeddingCache(
+        SessionLocal,
+        retention=timedelta(days=settings.EMBEDDING_CACHE_RETENTION_DAYS),
+    )
+    ingest_fn = partial(ingest_doc, embed_texts_fn=embedding_cache.embed_texts)
 
     while not STOP_LISTENER_EVENT.is_set():
         try:
-            revalidate_service = RevalidatePostsService.from_settings(settings)
-            if settings.REVALIDATE_SECRET:
-                logger.info(
-                    "Post revalidation enabled url=%s",
-                    settings.REVALIDATE_POSTS_URL,
-                )
-            else:
-                logger.info("Post revalidation disabled (REVALIDATE_SECRET not set)")
             couch_db, couch_parser = get_couch()
             with SessionLocal() as db_session:
                 seq_repo = LastSeqRepo(db_session)
+                checkpoint = SeqCheckpoint(seq_repo)
                 last_seq = seq_repo.get_last_seq()
+                # 1s heartbeats let idle periods flush the pending checkpoint
                 url = (
                     f"{settings.couchdb_url}/{settings.COUCHDB_DATABASE}/_changes"
-                    f"?feed=continuous&include_docs=true&since={last_seq}&heartbeat=true"
+                    f"?feed=continuous&include_docs=true&since={last_seq}&heartbeat=1000"
                 )
                 logger.info(f"Connecting to CouchDB _changes since ({last_seq})...")
 
-                with httpx.stream(
-                    "GET",
-                    url,
-                    timeout=httpx.Timeout(
-                        connect=5.0, read=None, write=None, pool=None
-                    ),
-                ) as response:
-                    logger.info("Connected, waiting for changes...")
-                    backoff = 1  # reset backoff after successful connection
-
-                    for line in response.iter_lines():
-                        if STOP_LISTENER_EVENT.is_set():
-                            logger.info("Listener stopping...")
-                            return
-
-                        # skip heartbeat or empty lines
-                        line = line.strip()
-                        if not line:
-                            continue
-
-                        try:
-                            change = json.loads(line)
+                try:
+                    with httpx.stream(
+                        "GET",
+                        url,
+                        timeout=httpx.Timeout(
+                            connect=5.0, read=None, write=None, pool=None
+                        ),
+                    ) as response:
+                        logger.info("Connected, waiting for changes...")
+                        backoff = 1  # reset backoff after successful connection
+
+                        for line in response.iter_lines():
+                            if STOP_LISTENER_EVENT.is_set():
+                                logger.info("Listener stopping...")
+                                return
+
+                            # heartbeat or empty lines only advance the checkpoint
+                            line = line.strip()
+                            if not line:
+                                checkpoint.maybe_flush()
+                                embedding_cache.maybe_prune()
+                                continue
+
+                            try:
+                                change = orjson.loads(line)
+                            except orjson.JSONDecodeError:
+                                logger.warning(f"Skipping invalid JSON line: {line}")
+                                continue
+
                             last_seq = change.get("seq", last_seq)
-                            seq_repo.update_last_seq(last_seq)
-                            process_change(
-                                change,
-                                db_session,
-                                couch_parser,
-                                revalidate_posts_fn=revalidate_service.revalidate_posts,
-                            )
-                        except json.JSONDecodeError:
-                            logger.warning(f"Skipping invalid JSON line: {line}")
-                        except Exception as e:
-                            logger.error(f"Error processing change: {e}")
+                            try:
+                                process_change(
+                                    change,
+                                    db_session,
+                                    couch_parser,
+                                    ingest_fn=ingest_fn,
+                                    revalidate_posts_fn=enqueue_revalidation,
+                                    on_docs_changed=on_docs_changed,
+                                )
+                            except Exception as e:
+                                logger.error(f"Error processing change: {e}")
+                            checkpoint.record(last_seq)
+                finally:
+                    # Persist progress on shutdown or before reconnecting
+                    try:
+                        checkpoint.flush()
+                    except Exception as e:
+                        logger.error(f"Failed to save last_seq: {e}")
 
         except httpx.RequestError as e:
             logger.error(f"HTTP connection error: {e}")
@@ -97,10 +164,15 @@ def process_change(
     *,
     ingest_fn: Callable = ingest_doc,
     revalidate_posts_fn: Callable[[str | None], bool] | None = None,
+    on_docs_changed: Callable[[], None] | None = None,
     settings_obj: Settings = settings,
     doc_model=Doc,
 ):
-    """Process a single CouchDB change entry"""
+    """
+    Process a single CouchDB change entry.
+    on_docs_changed runs after docs are written or deleted, e.g. to drop
+    cached RAG answers that were built from the old content.
+    """
     doc = change.get("doc")
     if not doc:
         logger.debug(f"No doc in change {change.get('id')}")
@@ -114,6 +186,8 @@ def process_change(
         )
         db_session.commit()
         logger.info(f"Deleted {deleted_count} chunks for doc {doc_id}")
+        if deleted_count and on_docs_changed is not None:
+            on_docs_changed()
 
         if revalidate_posts_fn is not None:
             candidate = (doc.get("path") or doc.get("_id") or "").strip()
@@ -140,6 +214,9 @@ def process_change(
         logger.error(f"Failed to ingest doc {doc['_id']}: {e}")
         return
 
+    if ingested_slug is not None and on_docs_changed is not None:
+        on_docs_changed()
+
     if revalidate_posts_fn is None:
         return
 
@@ -159,19 +236,82 @@ def _extract_blog_slug(
     candidate = (ingested_slug or "").strip() or (
         doc.get("path") or doc.get("_id") or ""
     )
-    if not candidate.startswith(settings_obj.BLOG_PREFIX):
+    return _slug_from_candidate(candidate, settings_obj.BLOG_PREFIX)
+
+
+@lru_cache(maxsize=8)
+def _blog_slug_pattern(blog_prefix: str) -> re.Pattern:
+    return re.compile(rf"{re.escape(blog_prefix)}(.*?)(?:\.md)?", re.DOTALL)
+
+
+@lru_cache(maxsize=1024)
+def _slug_from_candidate(candidate: str, blog_prefix: str) -> str | None:
+    # Reingesting the same docs repeats candidates, so results are memoized
+    match = _blog_slug_pattern(blog_prefix).fullmatch(candidate)
+    if match is None:
         return None
-    slug = candidate.removeprefix(settings_obj.BLOG_PREFIX)
-    if slug.endswith(".md"):
-        slug = slug[:-3]
-    slug = slug.strip()
-    return slug or None
+    return match.group(1).strip() or None
+
+
+def enqueue_revalidation(
+    slug: str | None,
+    *,
+    revalidate_queue: queue.Queue = REVALIDATE_QUEUE,
+) -> bool:
+    """Queue a revalidation without blocking the changes feed; drops it when full."""
+    try:
+        revalidate_queue.put_nowait(slug)
+        return True
+    except queue.Full:
+        logger.warning(f"Revalidation queue full, dropping slug={slug}")
+        return False
 
 
-def start_listener():
-    """Start listener in a daemon thread"""
+def revalidation_worker(
+    revalidate_service: RevalidatePostsService,
+    *,
+    revalidate_queue: queue.Queue = REVALIDATE_QUEUE,
+    stop_event: threading.Event = STOP_LISTENER_EVENT,
+):
+    """Drain queued revalidations until the listener stops, then close the client."""
+    try:
+        while not stop_event.is_set():
+            try:
+                slug = revalidate_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            try:
+                revalidate_service.revalidate_posts(slug)
+            except Exception as e:
+                logger.error(f"Revalidation failed for slug={slug}: {e}")
+            finally:
+                revalidate_queue.task_done()
+    finally:
+        revalidate_service.close()
+
+
+def start_listener(on_docs_changed: Callable[[], None] | None = None):
+    """Start listener and revalidation worker in daemon threads"""
+    revalidate_service = RevalidatePostsService.from_settings(settings)
+    if settings.REVALIDATE_SECRET:
+        logger.info(
+            "Post revalidation enabled url=%s",
+            settings.REVALIDATE_POSTS_URL,
+        )
+    else:
+        logger.info("Post revalidation disabled (REVALIDATE_SECRET not set)")
+    threading.Thread(
+        target=revalidation_worker,
+        args=(revalidate_service,),
+        daemon=True,
+        name="RevalidationWorker",
+    ).start()
+
     thread = threading.Thread(
-        target=listen_changes, daemon=True, name="CouchDBListener"
+        target=listen_changes,
+        args=(on_docs_changed,),
+        daemon=True,
+        name="CouchDBListener",
     )
     thread.start()
     logger.info("CouchDB listener started in background thread")
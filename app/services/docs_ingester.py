@@ -1,16 +1,15 @@
 import logging
 import re
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import NamedTuple, Optional
 
-from llama_index.core import Document
-from llama_index.core.node_parser import SemanticSplitterNodeParser
-from llama_index.embeddings.openai import OpenAIEmbedding
 from sqlalchemy.orm import Session
 
 from app.models.doc import Doc
 from app.services.content_enhancer import ContentEnhancer
 from app.services.posts_service import parse_post_data
-from app.services.text_embedder import embed_text
+from app.services.text_embedder import embed_texts
 from app.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -96,17 +95,27 @@ def map_chunks_to_sections(content: str, chunks: list[str], sections):
     return chunk_sections, chunk_heading_paths
 
 
-def ingest_doc(
-    db: Session,
+class PreparedDoc(NamedTuple):
+    """Chunked and embedded doc, ready to be written to Postgres."""
+
+    slug: str
+    docs: list[Doc]
+    chunk_count: int
+
+
+def prepare_doc(
     raw_doc: dict,
     *,
     parser,
     enhance_content=ContentEnhancer().enhance_content,
-    embed_text_fn=embed_text,
+    embed_texts_fn=embed_texts,
     parse_post_data_fn=None,
     chunk_text_fn=None,
-) -> Optional[str]:
-    """Ingest a single CouchDB doc into Postgres with chunking + embedding."""
+) -> Optional[PreparedDoc]:
+    """
+    Parse, chunk and embed a CouchDB doc without touching the database.
+    All chunks of the doc are embedded with a single embed_texts_fn call.
+    """
 
     parse_post_data_fn = parse_post_data_fn or parse_post_data
     chunk_text_fn = chunk_text_fn or chunk_text
@@ -128,65 +137,139 @@ def ingest_doc(
     chunk_sections, chunk_heading_paths = map_chunks_to_sections(
         content, chunks, sections
     )
-    new_docs = []
-    success_count = 0
-
+    metadata = {
+        "tags": post_data.get("tags", []),
+        "summary": post_data.get("summary"),
+    }
+    enhanced = []
     for i, chunk in enumerate(chunks):
         try:
             # Enhance content with metadata before embedding
-            enhanced_content = enhance_content(
-                content=chunk,
+            enhanced.append(
+                (i, enhance_content(content=chunk, title=title, metadata=metadata))
+            )
+        except Exception as e:
+            logger.error(f"Failed to enhance chunk for doc {slug}: {e}")
+
+    embeddings = _embed_chunks([text for _, text in enhanced], embed_texts_fn, slug)
+    new_docs = []
+    for (i, _), embedding in zip(enhanced, embeddings):
+        if embedding is None:
+            continue
+        new_docs.append(
+            Doc(
+                document_id=raw_doc["_id"],
+                slug=slug,
                 title=title,
-                metadata={
+                content=chunks[i],  # Store original content for display
+                embedding=embedding,
+                doc_metadata={
+                    "order": i,
+                    "section": chunk_sections.get(i),
+                    "heading_path": chunk_heading_paths.get(i, []),
                     "tags": post_data.get("tags", []),
+                    "created_at": post_data.get("publishedAt"),
+                    "updated_at": post_data.get("updatedAt"),
                     "summary": post_data.get("summary"),
+                    "source": (
+                        "blog" if slug.startswith(settings.BLOG_PREFIX) else "kb"
+                    ),
                 },
             )
-            embedding = embed_text_fn(enhanced_content)
-            new_docs.append(
-                Doc(
-                    document_id=raw_doc["_id"],
-                    slug=slug,
-                    title=title,
-                    content=chunk,  # Store original content for display
-                    embedding=embedding,
-                    doc_metadata={
-                        "order": i,
-                        "section": chunk_sections.get(i),
-                        "heading_path": chunk_heading_paths.get(i, []),
-                        "tags": post_data.get("tags", []),
-                        "created_at": post_data.get("publishedAt"),
-                        "updated_at": post_data.get("updatedAt"),
-                        "summary": post_data.get("summary"),
-                        "source": (
-                            "blog" if slug.startswith(settings.BLOG_PREFIX) else "kb"
-                        ),
-                    },
-                )
-            )
-            success_count += 1
+        )
+
+    return PreparedDoc(slug=slug, docs=new_docs, chunk_count=len(chunks))
+
+
+def _embed_chunks(
+    texts: list[str], embed_texts_fn, slug: str
+) -> list[Optional[list[float]]]:
+    """
+    Embed a doc's chunks in one request. If the batch fails, retry chunk by
+    chunk so one bad chunk doesn't drop the whole doc; failures become None.
+    """
+    if not texts:
+        return []
+    try:
+        return list(embed_texts_fn(texts))
+    except Exception as e:
+        logger.warning(
+            f"Batch embedding failed for doc {slug}, retrying per chunk: {e}"
+        )
+
+    embeddings = []
+    for text in texts:
+        try:
+            embeddings.append(embed_texts_fn([text])[0])
         except Exception as e:
             logger.error(f"Failed to embed chunk for doc {slug}: {e}")
-            continue
+            embeddings.append(None)
+    return embeddings
+
 
-    if success_count > 0:
+def save_prepared_doc(
+    db: Session, raw_doc: dict, prepared: Optional[PreparedDoc]
+) -> Optional[str]:
+    """Replace a doc's chunks in Postgres with freshly prepared ones."""
+    if prepared is None:
+        return None
+
+    if prepared.docs:
         # only delete old chunks if we have at least one successful embedding
         db.query(Doc).filter(Doc.document_id == raw_doc["_id"]).delete(
             synchronize_session=False
         )
-        db.add_all(new_docs)
+        db.add_all(prepared.docs)
         db.commit()
-        logger.info(f"Ingested {slug}: {success_count}/{len(chunks)} chunks")
-        return slug
+        logger.info(
+            f"Ingested {prepared.slug}: "
+            f"{len(prepared.docs)}/{prepared.chunk_count} chunks"
+        )
+        return prepared.slug
     else:
-        logger.warning(f"Doc {slug} had no successfully embedded chunks")
+        logger.warning(f"Doc {prepared.slug} had no successfully embedded chunks")
         return None
 
 
-def ingest_all(db: Session, *, parser, ingest_fn=None):
-    """One-time ingestion of all CouchDB docs. Also removes deleted docs."""
-    ingest_fn = ingest_fn or ingest_doc
+def ingest_doc(
+    db: Session,
+    raw_doc: dict,
+    *,
+    parser,
+    enhance_content=ContentEnhancer().enhance_content,
+    embed_texts_fn=embed_texts,
+    parse_post_data_fn=None,
+    chunk_text_fn=None,
+) -> Optional[str]:
+    """Ingest a single CouchDB doc into Postgres with chunking + embedding."""
+    prepared = prepare_doc(
+        raw_doc,
+        parser=parser,
+        enhance_content=enhance_content,
+        embed_texts_fn=embed_texts_fn,
+        parse_post_data_fn=parse_post_data_fn,
+        chunk_text_fn=chunk_text_fn,
+    )
+    return save_prepared_doc(db, raw_doc, prepared)
+
+
+def ingest_all(
+    db: Session,
+    *,
+    parser,
+    ingest_fn=None,
+    prepare_fn=None,
+    embed_texts_fn=embed_texts,
+    max_workers: int = 4,
+):
+    """
+    One-time ingestion of all CouchDB docs. Also removes deleted docs.
+    Docs are chunked and embedded concurrently since that is network-bound;
+    writes stay on the calling thread because the session isn't thread-safe.
+    Pass a cached embed_texts_fn so unchanged chunks aren't re-embedded.
+    """
     all_docs = [row.get("doc", row) for row in parser.db.all(include_docs=True)]
+    to_ingest = []
     for doc in all_docs:
         # Remove deleted docs from Postgres
         if doc.get("deleted", False):
@@ -205,7 +288,18 @@ def ingest_all(db: Session, *, parser, ingest_fn=None):
         ):
             continue
 
-        ingest_fn(db, doc, parser=parser)
+        to_ingest.append(doc)
+
+    if ingest_fn is not None:
+        for doc in to_ingest:
+            ingest_fn(db, doc, parser=parser)
+        return
+
+    prepare_fn = prepare_fn or partial(prepare_doc, embed_texts_fn=embed_texts_fn)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        prepared_docs = pool.map(lambda doc: prepare_fn(doc, parser=parser), to_ingest)
+        for doc, prepared in zip(to_ingest, prepared_docs):
+            save_prepared_doc(db, doc, prepared)
 
 
 def chunk_text(
@@ -220,6 +314,12 @@ def chunk_text(
     if not text:
         return []
 
+    # llama_index is slow to import and only needed here, so load it on first
+    # use instead of at app startup (this module is imported by the listener).
+    from llama_index.core import Document
+    from llama_index.core.node_parser import SemanticSplitterNodeParser
+    from llama_index.embeddings.openai import OpenAIEmbedding
+
     embed_model = embed_model or OpenAIEmbedding(
         model="text-embedding-3-small",
         api_key=settings.OPENAI_API_KEY or None,
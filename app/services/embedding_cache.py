@@ -0,0 +1,142 @@
+import hashlib
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List
+
+import numpy as np
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models.embedding_cache import CachedEmbedding
+from app.services.text_embedder import EMBEDDING_MODEL, EMBEDDING_PROVIDER, embed_texts
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Postgres-backed embedding cache keyed by (sha256(text), provider, model).
+    Looks up a whole batch in one query and only embeds the misses.
+    Rows older than ``retention`` are deleted by ``prune``; a pruned text is
+    simply embedded (and cached) again the next time it is seen.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable,
+        *,
+        embed_texts_fn: Callable[[List[str]], List[List[float]]] = embed_texts,
+        provider: str = EMBEDDING_PROVIDER,
+        model: str = EMBEDDING_MODEL,
+        cache_model=CachedEmbedding,
+        retention: timedelta | None = None,
+        prune_interval: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        # Uses its own short-lived sessions so cache writes never ride along
+        # with (or get rolled back by) the caller's transaction.
+        self.session_factory = session_factory
+        self.embed_texts_fn = embed_texts_fn
+        self.provider = provider
+        self.model = model
+        self.cache_model = cache_model
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self.clock = clock
+        self._last_prune: float | None = None
+
+    def embed_text(self, text: str) -> List[float]:
+        return self.embed_texts([text])[0]
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+
+        hashes = [content_hash(text) for text in texts]
+        with self.session_factory() as db:
+            vectors = self._lookup(db, hashes)
+
+            # Embed each distinct missing text once, preserving first-seen order
+            uncached: Dict[str, str] = {}
+            for text, text_hash in zip(texts, hashes):
+                if text_hash not in vectors:
+                    uncached.setdefault(text_hash, text)
+
+            if uncached:
+                fresh = self.embed_texts_fn(list(uncached.values()))
+                fresh_vectors = dict(zip(uncached.keys(), fresh))
+                self._store(db, fresh_vectors)
+                vectors.update(fresh_vectors)
+
+        logger.debug(f"Embedding cache: {len(uncached)} misses for {len(texts)} texts")
+        return [vectors[text_hash] for text_hash in hashes]
+
+    def prune(self) -> int:
+        """Delete rows older than the retention window; returns rows deleted."""
+        if self.retention is None:
+            return 0
+        cutoff = datetime.now(timezone.utc) - self.retention
+        try:
+            with self.session_factory() as db:
+                deleted = (
+                    db.query(self.cache_model)
+                    .filter(self.cache_model.created_at < cutoff)
+                    .delete(synchronize_session=False)
+                )
+                db.commit()
+        except Exception as e:
+            logger.warning(f"Embedding cache prune failed: {e}")
+            return 0
+        logger.info(f"Pruned {deleted} embedding cache rows older than {cutoff}")
+        return deleted
+
+    def maybe_prune(self) -> int:
+        """Prune at most once per prune_interval seconds (first call always runs)."""
+        now = self.clock()
+        if (
+            self._last_prune is not None
+            and now - self._last_prune < self.prune_interval
+        ):
+            return 0
+        self._last_prune = now
+        return self.prune()
+
+    def _lookup(self, db, hashes: List[str]) -> Dict[str, List[float]]:
+        try:
+            rows = (
+                db.query(self.cache_model.hash, self.cache_model.vector)
+                .filter(self.cache_model.provider == self.provider)
+                .filter(self.cache_model.model == self.model)
+                .filter(self.cache_model.hash.in_(set(hashes)))
+                .all()
+            )
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            db.rollback()
+            return {}
+        return {
+            text_hash: np.frombuffer(vector, dtype=np.float32).tolist()
+            for text_hash, vector in rows
+        }
+
+    def _store(self, db, vectors: Dict[str, List[float]]) -> None:
+        rows = [
+            {
+                "hash": text_hash,
+                "provider": self.provider,
+                "model": self.model,
+                "vector": np.asarray(vector, dtype=np.float32).tobytes(),
+            }
+            for text_hash, vector in vectors.items()
+        ]
+        try:
+            stmt = insert(self.cache_model).values(rows).on_conflict_do_nothing()
+            db.execute(stmt)
+            db.commit()
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+            db.rollback()
@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from app.schemas.doc import DocResult
+
+
+class CachedPrompt(NamedTuple):
+    """Retrieval result (and optionally the reply) served for a cached query."""
+
+    relevant_docs: List[DocResult]
+    assistant_text: Optional[str] = None
+
+
+class ProximityCache:
+    """
+    Similarity-keyed LRU cache for query embeddings.
+
+    Keys are L2-normalized vectors stored row-wise in a preallocated matrix, so a
+    lookup is a single matrix-vector product followed by an argmax. A lookup hits
+    when the cosine distance to the nearest key in the same ``scope`` is within
+    ``tau`` and the entry is younger than ``ttl`` seconds (when set).
+    """
+
+    def __init__(
+        self,
+        capacity: int = 512,
+        dim: int = 1536,
+        *,
+        ttl: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.dim = dim
+        self.ttl = ttl
+        self.clock = clock
+        self.keys = np.zeros((capacity, dim), dtype=np.float32)
+        self._scopes: List[Hashable] = [None] * capacity
+        self._expires_at = np.full(capacity, np.inf)
+        # slot -> value, ordered from least to most recently used
+        self._entries: OrderedDict[int, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(
+        self, vector: Sequence[float], tau: float = 0.05, *, scope: Hashable = None
+    ) -> Any | None:
+        """Return the value of the nearest live key within tau of vector, else None."""
+        query = self._normalize(vector)
+        if query is None:
+            return None
+        with self._lock:
+            slot = self._nearest(query, tau, scope, live_only=True)
+            if slot is None:
+                return None
+            self._entries.move_to_end(slot)
+            return self._entries[slot]
+
+    def insert(
+        self,
+        vector: Sequence[float],
+        value: Any,
+        *,
+        scope: Hashable = None,
+        tau: float | None = None,
+    ) -> None:
+        """
+        Store value under vector, evicting the least recently used entry.
+        With tau set, an existing key within tau in the same scope (expired or
+        not) is overwritten in place instead of adding a near-duplicate.
+        """
+        key = self._normalize(vector)
+        if key is None:
+            return
+        with self._lock:
+            slot = None
+            if tau is not None:
+                slot = self._nearest(key, tau, scope, live_only=False)
+            if slot is not None:
+                self._entries.move_to_end(slot)
+            elif len(self._entries) < self.capacity:
+                slot = len(self._entries)
+            else:
+                slot, _ = self._entries.popitem(last=False)
+            self.keys[slot] = key
+            self._scopes[slot] = scope
+            self._expires_at[slot] = (
+                self.clock() + self.ttl if self.ttl is not None else np.inf
+            )
+            self._entries[slot] = value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _nearest(
+        self, query: np.ndarray, tau: float, scope: Hashable, *, live_only: bool
+    ) -> int | None:
+        size = len(self._entries)
+        if size == 0:
+            return None
+        # Slots are filled in order and reused on eviction, so the first
+        # `size` rows are always the occupied ones.
+        scores = self.keys[:size] @ query
+        excluded = np.fromiter(
+            (s != scope for s in self._scopes[:size]), dtype=bool, count=size
+        )
+        if live_only:
+            excluded |= self._expires_at[:size] <= self.clock()
+        scores[excluded] = -np.inf
+        slot = int(np.argmax(scores))
+        if 1.0 - float(scores[slot]) > tau:
+            return None
+        return slot
+
+    def _normalize(self, vector: Sequence[float]) -> np.ndarray | None:
+        arr = np.asarray(vector, dtype=np.float32)
+        if arr.shape != (self.dim,):
+            raise ValueError(f"Expected a vector of dimension {self.dim}")
+        norm = float(np.linalg.norm(arr))
+        if norm == 0.0:
+            return None  # no direction to compare against
+        return arr / norm
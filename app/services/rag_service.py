@@ -2,11 +2,14 @@ import hashlib
 import json
 import logging
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 from openai import AsyncOpenAI
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from app.models.doc import Doc
@@ -19,6 +22,14 @@ from app.settings import settings
 
 logger = logging.getLogger(__name__)
 
+STREAM_ERROR_MESSAGE = "\n[Error: Could not get response from the model]"
+
+
+@lru_cache(maxsize=4)
+def load_prompt_template(path: str) -> str:
+    """Read a prompt template once instead of on every streamed response."""
+    return Path(path).read_text(encoding="utf-8")
+
 
 class RAGService:
     def __init__(
@@ -32,6 +43,7 @@ class RAGService:
         embed_text_fn=embed_text,
         content_enhancer_service: ContentEnhancer | None = None,
         doc_model=Doc,
+        hnsw_ef_search: int | None = None,
     ):
         self.db = db
         self.chat_model = chat_model or settings.RAG_CHAT_MODEL
@@ -48,44 +60,67 @@ class RAGService:
         self.embed_text_fn = embed_text_fn
         self.content_enhancer = content_enhancer_service or ContentEnhancer()
         self.doc_model = doc_model
+        self.hnsw_ef_search = hnsw_ef_search or settings.RAG_HNSW_EF_SEARCH
+
+    def _result_columns(self) -> tuple:
+        """Columns needed to build a DocResult, leaving out the large embedding."""
+        model = self.doc_model
+        return (model.id, model.slug, model.title, model.content, model.doc_metadata)
+
+    def embed_query(self, query: str) -> List[float]:
+        """Expand and embed a search query, validating the embedding dimension."""
+        # Expand query to improve semantic matching
+        expanded_query = self.query_expander.expand_query(query)
+        embedding = self.embed_text_fn(expanded_query)
+        if embedding is None or len(embedding) != 1536:
+            raise HTTPException(400, "Invalid embedding for query")
+        return embedding
 
     def get_relevant_documents(
-        self, query: str, limit: int, threshold: float
+        self,
+        query: str,
+        limit: int,
+        threshold: float,
+        embedding: Optional[List[float]] = None,
     ) -> List[DocResult]:
         """
         Embeds a query and performs semantic search with cosine similarity.
         Retrieves the content of documents with similarity above the threshold.
+        Accepts a pre-computed query embedding to avoid embedding twice.
         """
 
         try:
-            # Expand query to improve semantic matching
-            expanded_query = self.query_expander.expand_query(query)
-            embedding = self.embed_text_fn(expanded_query)
-            if not embedding or len(embedding) != 1536:
-                raise HTTPException(400, "Invalid embedding for query")
+            if embedding is None:
+                embedding = self.embed_query(query)
 
             distance = self.doc_model.embedding.cosine_distance(embedding)
             similarity = (1 - distance).label("similarity")
 
+            # The HNSW index returns at most ef_search candidates, so never
+            # search fewer than the number of results requested.
+            ef_search = max(self.hnsw_ef_search, limit)
+            self.db.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef_search)}"))
+
+            # Order by the raw distance (ascending) so pgvector can use the index
             results = (
-                self.db.query(self.doc_model, similarity)
+                self.db.query(*self._result_columns(), similarity)
                 .filter(self.doc_model.embedding.isnot(None))
                 .filter(similarity >= threshold)
-                .order_by(similarity.desc())
+                .order_by(distance)
                 .limit(limit)
                 .all()
             )
 
             return [
                 DocResult(
-                    id=doc.id,
-                    slug=doc.slug,
-                    title=doc.title,
-                    content=doc.content,
-                    doc_metadata=doc.doc_metadata,
+                    id=doc_id,
+                    slug=slug,
+                    title=title,
+                    content=content,
+                    doc_metadata=doc_metadata,
                     similarity=round(sim, 4),
                 )
-                for doc, sim in results
+                for doc_id, slug, title, content, doc_metadata, sim in results
             ]
 
         except HTTPException:
@@ -96,7 +131,11 @@ class RAGService:
             raise Exception("Internal error during search") from e
 
     def get_relevant_documents_with_navigation(
-        self, query: str, limit: int, threshold: float
+        self,
+        query: str,
+        limit: int,
+        threshold: float,
+        embedding: Optional[List[float]] = None,
     ) -> List[DocResult]:
         """
         Enhanced version that always includes navigation content at the top.
@@ -104,11 +143,13 @@ class RAGService:
         """
         try:
             # Get regular results (reserve 1 spot for navigation)
-            regular_results = self.get_relevant_documents(query, limit - 1, threshold)
+            regular_results = self.get_relevant_documents(
+                query, limit - 1, threshold, embedding=embedding
+            )
 
             # Force include navigation content with high priority
             navigation_docs = (
-                self.db.query(self.doc_model)
+                self.db.query(*self._result_columns())
                 .filter(
                     self.doc_model.doc_metadata.op("->>")("contentType") == "navigation"
                 )
@@ -118,14 +159,14 @@ class RAGService:
             # Convert navigation docs to DocResult with high similarity
             navigation_results = [
                 DocResult(
-                    id=doc.id,
-                    slug=doc.slug,
-                    title=doc.title,
-                    content=doc.content,
-                    doc_metadata=doc.doc_metadata,
+                    id=doc_id,
+                    slug=slug,
+                    title=title,
+                    content=content,
+                    doc_metadata=doc_metadata,
                     similarity=0.95,  # High fixed similarity to ensure top ranking
                 )
-                for doc in navigation_docs
+                for doc_id, slug, title, content, doc_metadata in navigation_docs
             ]
 
             # Combine and ensure navigation is at top
@@ -136,7 +177,9 @@ class RAGService:
         except Exception as e:
             logger.error(f"Error during navigation-enhanced search: {e}")
             # Fall back to regular search if navigation enhancement fails
-            return self.get_relevant_documents(query, limit, threshold)
+            return self.get_relevant_documents(
+                query, limit, threshold, embedding=embedding
+            )
 
     async def stream_chat_response(
         self,
@@ -153,10 +196,15 @@ class RAGService:
         # The last message is always the user's question
         latest_user_question = messages[-1].content
 
-        # 1. Retrieve relevant docs using navigation-enhanced search
-        relevant_docs = relevant_docs or self.get_relevant_documents_with_navigation(
-            query=latest_user_question, limit=limit, threshold=threshold
-        )
+        # 1. Retrieve relevant docs using navigation-enhanced search.
+        # Retrieval is blocking (embedding + DB), so keep it off the event loop.
+        if relevant_docs is None:
+            relevant_docs = await run_in_threadpool(
+                self.get_relevant_documents_with_navigation,
+                query=latest_user_question,
+                limit=limit,
+                threshold=threshold,
+            )
 
         # 2. Build enriched context
         context_parts = []
@@ -198,18 +246,27 @@ class RAGService:
         context_text = "\n".join(context_parts) or "No relevant context available."
         logger.debug(f"Context for RAG:\n{context_text}")
 
-        # 3. Prepare system prompt
-        prompt_template = Path(settings.RAG_SYSTEM_PROMPT_PATH).read_text(
-            encoding="utf-8"
-        )
-        system_prompt = prompt_template.replace(
-            "{year}", str(datetime.now().year)
-        ).replace("{context}", context_text)
-
-        # 4. Build messages with existing chat history
+        # 3. Prepare system prompt. It must stay byte-identical across requests
+        # (only {year} varies) so the provider's prompt prefix cache can reuse it;
+        # per-request context goes into its own message near the end instead.
+        prompt_template = load_prompt_template(settings.RAG_SYSTEM_PROMPT_PATH)
+        system_prompt = prompt_template.replace("{year}", str(datetime.now().year))
+        context_message = {"role": "system", "content": f"## CONTEXT\n\n{context_text}"}
+        if "{context}" in system_prompt:
+            # Older templates embed the context inline; keep supporting them
+            system_prompt = system_prompt.replace("{context}", context_text)
+            context_message = None
+
+        # 4. Build messages: static prefix, chat history, then context and the
+        # latest question last
         prompt_messages = [{"role": "system", "content": system_prompt}]
-        for message in messages:
+        for message in messages[:-1]:
             prompt_messages.append({"role": message.role, "content": message.content})
+        if context_message is not None:
+            prompt_messages.append(context_message)
+        prompt_messages.append(
+            {"role": messages[-1].role, "content": messages[-1].content}
+        )
 
         # 5. Stream response
         try:
@@ -232,7 +289,7 @@ class RAGService:
                     yield content
         except Exception as e:
             logger.error(f"Error streaming OpenAI response: {e}")
-            yield f"\n[Error: Could not get response from the model]"
+            yield STREAM_ERROR_MESSAGE
 
     def _generate_content_hash(self, chunk: ContentChunk) -> str:
         """Generate SHA-256 hash for content change detection."""
@@ -22,10 +22,19 @@ class RevalidatePostsService:
         self._client = client
 
     @classmethod
-    def from_settings(cls, settings_obj: Settings) -> "RevalidatePostsService":
+    def from_settings(
+        cls, settings_obj: Settings, *, timeout_seconds: float = 5.0
+    ) -> "RevalidatePostsService":
+        # One long-lived client keeps connections to the endpoint alive between
+        # calls; the owner releases it with close().
         return cls(
             url=settings_obj.REVALIDATE_POSTS_URL,
             secret=settings_obj.REVALIDATE_SECRET,
+            timeout_seconds=timeout_seconds,
+            client=httpx.Client(
+                timeout=timeout_seconds,
+                limits=httpx.Limits(max_keepalive_connections=4),
+            ),
         )
 
     def revalidate_posts(self, slug: str | None = None) -> bool:
@@ -46,6 +55,10 @@ class RevalidatePostsService:
         with httpx.Client(timeout=self.timeout_seconds) as client:
             return self._post(client, headers=headers, payload=payload)
 
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+
     def _post(
         self,
         client: httpx.Client,
@@ -2,9 +2,21 @@ from openai import OpenAI
 
 from app.settings import settings
 
+EMBEDDING_PROVIDER = "openai"
+EMBEDDING_MODEL = "text-embedding-3-small"
+
 
 def embed_text(text: str, client: OpenAI | None = None) -> list[float]:
     """Generate an embedding vector for given text."""
     client = client or OpenAI(api_key=settings.OPENAI_API_KEY or None)
-    resp = client.embeddings.create(model="text-embedding-3-small", input=text)
+    resp = client.embeddings.create(model=EMBEDDING_MODEL, input=text)
     return resp.data[0].embedding
+
+
+def embed_texts(texts: list[str], client: OpenAI | None = None) -> list[list[float]]:
+    """Generate embedding vectors for several texts in a single request."""
+    if not texts:
+        return []
+    client = client or OpenAI(api_key=settings.OPENAI_API_KEY or None)
+    resp = client.embeddings.create(model=EMBEDDING_MODEL, input=texts)
+    return [item.embedding for item in sorted(resp.data, key=lambda d: d.index)]
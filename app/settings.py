@@ -55,6 +55,13 @@ class Settings(BaseSettings):
     RAG_CHAT_MODEL: str = "gpt-5-mini"
     RAG_REASONING_EFFORT: Literal["minimal", "low", "medium", "high"] | None = "low"
     RAG_SYSTEM_PROMPT_PATH: str = DEFAULT_RAG_SYSTEM_PROMPT_PATH
+    RAG_PROMPT_CACHE_SIZE: int = 512
+    RAG_PROMPT_CACHE_MAX_DISTANCE: float = 0.05
+    # Bounds staleness across workers, whose caches are cleared independently
+    RAG_PROMPT_CACHE_TTL_SECONDS: float = 3600.0
+    RAG_HNSW_EF_SEARCH: int = 40
+    # Cached embeddings (mostly one-off user queries) are deleted after this age
+    EMBEDDING_CACHE_RETENTION_DAYS: int = 30
 
     # Knowledge Base
     KB_PREFIX: str = "kb/"
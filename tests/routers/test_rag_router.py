@@ -1,10 +1,17 @@
+import asyncio
 import uuid
 from types import SimpleNamespace
 
+import orjson
+import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
+from starlette.background import BackgroundTask
+from starlette.requests import ClientDisconnect
 
 from app.routers import rag
+from app.schemas.rag import PromptRequest
+from app.services.prompt_cache import ProximityCache
 
 
 class DummyChatLogger:
@@ -16,19 +23,19 @@ class DummyChatLogger:
     def ensure_chat_id(self, chat_id=None):
         return chat_id or uuid.uuid4()
 
-    def next_sequence(self, chat_id):
-        return 1
-
     def log_message(self, **kwargs):
-        return None
+        return kwargs.get("seq") or 1
 
 
-def build_client(rag_service, chat_logger=None):
+def build_client(rag_service, chat_logger=None, prompt_cache=None):
     app = FastAPI()
     app.dependency_overrides[rag.get_rag_service] = lambda: rag_service
     if chat_logger is None:
         chat_logger = DummyChatLogger()
     app.dependency_overrides[rag.get_chat_logger] = lambda: chat_logger
+    if prompt_cache is None:
+        prompt_cache = ProximityCache(capacity=4)
+    app.dependency_overrides[rag.get_prompt_cache] = lambda: prompt_cache
     app.include_router(rag.router)
     return TestClient(app)
 
@@ -48,7 +55,8 @@ def test_prompt_streams_response():
 
     rag_service = SimpleNamespace(
         stream_chat_response=fake_stream,
-        get_relevant_documents_with_navigation=lambda query, limit, threshold: [],
+        embed_query=lambda query: [1.0] * 1536,
+        get_relevant_documents_with_navigation=lambda query, limit, threshold, embedding: [],
     )
     client = build_client(rag_service)
 
@@ -62,6 +70,276 @@ def test_prompt_streams_response():
     assert res.text == "hello"
 
 
+class RecordingChatLogger(DummyChatLogger):
+    def __init__(self, events):
+        self.events = events
+        self.db = SimpleNamespace(
+            commit=lambda: events.append("commit"),
+            rollback=lambda: events.append("rollback"),
+        )
+
+    def log_message(self, **kwargs):
+        self.events.append(kwargs["role"])
+        return super().log_message(**kwargs)
+
+
+def make_recording_rag_service(events):
+    async def fake_stream(messages, limit, threshold, relevant_docs=None):
+        yield "hello"
+        events.append("streamed")
+
+    return SimpleNamespace(
+        stream_chat_response=fake_stream,
+        embed_query=lambda query: [1.0] * 1536,
+        get_relevant_documents_with_navigation=lambda query, limit, threshold, embedding: [],
+    )
+
+
+async def call_prompt(rag_service, chat_logger):
+    return await rag.prompt_rag(
+        PromptRequest(messages=[{"role": "user", "content": "Hi"}]),
+        limit=15,
+        threshold=0.25,
+        rag_service=rag_service,
+        chat_logger=chat_logger,
+        prompt_cache=ProximityCache(capacity=4),
+        chat_id_header=None,
+    )
+
+
+def test_prompt_commits_user_and_assistant_turns_once():
+    events = []
+    rag_service = make_recording_rag_service(events)
+    client = build_client(rag_service, chat_logger=RecordingChatLogger(events))
+
+    res = client.post("/prompt", json={"messages": [{"role": "user", "content": "Hi"}]})
+
+    assert res.status_code == 200
+    # The read transaction ends before streaming; both turns are written after
+    # the stream ends, in a single commit
+    assert events == ["rollback", "streamed", "user", "assistant", "commit"]
+
+
+@pytest.mark.asyncio
+async def test_prompt_persists_turns_in_response_background_task():
+    events = []
+    response = await call_prompt(
+        make_recording_rag_service(events), RecordingChatLogger(events)
+    )
+
+    assert isinstance(response.background, BackgroundTask)
+    assert [chunk async for chunk in response.body_iterator] == ["hello"]
+    # Nothing is written while streaming; the background task does it after
+    assert events == ["rollback", "streamed"]
+
+    await response.background()
+
+    assert events == ["rollback", "streamed", "user", "assistant", "commit"]
+
+
+async def run_disconnected_prompt(spec_version, events):
+    """Drive /prompt over ASGI until the client goes away after one chunk."""
+
+    async def stalling_stream(messages, limit, threshold, relevant_docs=None):
+        yield "hello"
+        await asyncio.sleep(10)  # the client disconnects while this waits
+        yield "never sent"
+
+    def get_chat_logger():
+        try:
+            yield RecordingChatLogger(events)
+        finally:
+            events.append("close")  # what get_db's teardown does to the session
+
+    rag_service = make_recording_rag_service(events)
+    rag_service.stream_chat_response = stalling_stream
+    app = FastAPI()
+    app.dependency_overrides[rag.get_rag_service] = lambda: rag_service
+    app.dependency_overrides[rag.get_chat_logger] = get_chat_logger
+    app.dependency_overrides[rag.get_prompt_cache] = lambda: ProximityCache(4)
+    app.include_router(rag.router)
+
+    body = orjson.dumps({"messages": [{"role": "user", "content": "Hi"}]})
+    first_chunk_sent = asyncio.Event()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await first_chunk_sent.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            if spec_version == "2.4":
+                # Servers on spec >= 2.4 report the disconnect by failing send()
+                raise OSError("client went away")
+            first_chunk_sent.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": spec_version},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/prompt",
+        "raw_path": b"/prompt",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+    try:
+        await asyncio.wait_for(app(scope, receive, send), timeout=5)
+    except ClientDisconnect:
+        pass
+    events.append("app returned")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("spec_version", ["2.3", "2.4"])
+async def test_prompt_persists_partial_reply_once_before_session_closes(
+    spec_version,
+):
+    events = []
+
+    await run_disconnected_prompt(spec_version, events)
+
+    # Saved exactly once, by the background task, while the session is open
+    assert events == [
+        "rollback",
+        "user",
+        "assistant",
+        "commit",
+        "close",
+        "app returned",
+    ]
+
+
+def make_streaming_rag_service():
+    async def fake_stream(messages, limit, threshold, relevant_docs=None):
+        yield "hello"
+
+    return SimpleNamespace(
+        stream_chat_response=fake_stream,
+        embed_query=lambda query: [1.0] * 1536,
+        get_relevant_documents_with_navigation=lambda query, limit, threshold, embedding: [],
+    )
+
+
+def test_prompt_uses_chat_id_header():
+    chat_id = uuid.uuid4()
+    client = build_client(make_streaming_rag_service())
+
+    res = client.post(
+        "/prompt",
+        json={"messages": [{"role": "user", "content": "Hi"}]},
+        headers={"X-Chat-Id": str(chat_id).upper()},
+    )
+
+    assert res.status_code == 200
+    assert res.headers["X-Chat-Id"] == str(chat_id)
+
+
+def test_prompt_rejects_malformed_chat_id_header():
+    client = build_client(make_streaming_rag_service())
+
+    res = client.post(
+        "/prompt",
+        json={"messages": [{"role": "user", "content": "Hi"}]},
+        headers={"X-Chat-Id": "{" + str(uuid.uuid4()) + "}"},
+    )
+
+    assert res.status_code == 400
+    assert res.json()["detail"] == "Invalid X-Chat-Id header"
+
+
+def test_prompt_serves_repeated_query_from_cache():
+    calls = {"retrieval": 0, "stream": 0}
+
+    def fake_retrieval(query, limit, threshold, embedding):
+        calls["retrieval"] += 1
+        return []
+
+    async def fake_stream(messages, limit, threshold, relevant_docs=None):
+        calls["stream"] += 1
+        yield "hello"
+
+    rag_service = SimpleNamespace(
+        stream_chat_response=fake_stream,
+        embed_query=lambda query: [1.0] * 1536,
+        get_relevant_documents_with_navigation=fake_retrieval,
+    )
+    client = build_client(rag_service)
+    body = {"messages": [{"role": "user", "content": "Hi"}]}
+
+    first = client.post("/prompt", json=body)
+    second = client.post("/prompt", json=body)
+
+    assert first.text == second.text == "hello"
+    assert calls == {"retrieval": 1, "stream": 1}
+
+
+def test_prompt_cache_is_scoped_by_retrieval_params():
+    calls = {"retrieval": 0}
+
+    def fake_retrieval(query, limit, threshold, embedding):
+        calls["retrieval"] += 1
+        return []
+
+    rag_service = make_streaming_rag_service()
+    rag_service.get_relevant_documents_with_navigation = fake_retrieval
+    prompt_cache = ProximityCache(capacity=8)
+    client = build_client(rag_service, prompt_cache=prompt_cache)
+    body = {"messages": [{"role": "user", "content": "Hi"}]}
+
+    client.post("/prompt", json=body, params={"limit": 15})
+    for _ in range(4):
+        client.post("/prompt", json=body, params={"limit": 10})
+
+    assert calls["retrieval"] == 2
+    assert len(prompt_cache) == 2
+
+
+def test_prompt_cache_reuses_docs_but_not_reply_for_follow_ups():
+    calls = {"retrieval": 0, "stream_docs": []}
+    doc = SimpleNamespace(slug="blog/cached")
+
+    def fake_retrieval(query, limit, threshold, embedding):
+        calls["retrieval"] += 1
+        return [doc]
+
+    async def fake_stream(messages, limit, threshold, relevant_docs=None):
+        calls["stream_docs"].append(relevant_docs)
+        yield "reply"
+
+    rag_service = SimpleNamespace(
+        stream_chat_response=fake_stream,
+        embed_query=lambda query: [1.0] * 1536,
+        get_relevant_documents_with_navigation=fake_retrieval,
+    )
+    client = build_client(rag_service)
+
+    client.post("/prompt", json={"messages": [{"role": "user", "content": "Hi"}]})
+    res = client.post(
+        "/prompt",
+        json={
+            "messages": [
+                {"role": "user", "content": "Hi"},
+                {"role": "assistant", "content": "reply"},
+                {"role": "user", "content": "Hi"},
+            ]
+        },
+    )
+
+    assert res.text == "reply"
+    assert calls["retrieval"] == 1
+    assert calls["stream_docs"] == [[doc], [doc]]
+
+
 def test_query_returns_debug_truncated():
     rag_service = SimpleNamespace(
         get_relevant_documents=lambda query, limit, threshold: [
@@ -119,13 +397,16 @@ def test_update_portfolio_content_returns_stats():
 def test_reingest_calls_ingest_all():
     calls = {}
 
-    def fake_ingest_all(db, parser):
+    def fake_ingest_all(db, parser, embed_texts_fn):
         calls["ingest_all"] = (db, parser)
+        calls["embed_texts_fn"] = embed_texts_fn
 
+    embedding_cache = SimpleNamespace(embed_texts=lambda texts: [])
     app = FastAPI()
     app.dependency_overrides[rag.get_db] = lambda: "db"
     app.dependency_overrides[rag.get_couch] = lambda: ("db", "parser")
     app.dependency_overrides[rag.get_ingest_all] = lambda: fake_ingest_all
+    app.dependency_overrides[rag.get_embedding_cache] = lambda: embedding_cache
     app.include_router(rag.router)
     client = TestClient(app)
 
@@ -133,3 +414,5 @@ def test_reingest_calls_ingest_all():
 
     assert res.status_code == 200
     assert calls["ingest_all"] == ("db", "parser")
+    # Reingest embeds through the cache so unchanged chunks skip the API
+    assert calls["embed_texts_fn"] is embedding_cache.embed_texts
@@ -0,0 +1,31 @@
+import uuid
+
+from app.services.chat_logger import ChatLogger
+from tests.conftest import FakeSession
+
+
+def test_log_message_assigns_sequence_in_insert():
+    session = FakeSession(execute_value=3)
+    chat_id = uuid.uuid4()
+
+    seq = ChatLogger(session).log_message(
+        chat_id=chat_id, role="user", content="hi", context_slugs=["blog/a"]
+    )
+
+    assert seq == 3
+    sql = str(session.executed_stmt)
+    assert "max(chat_messages.seq)" in sql
+    assert "RETURNING chat_messages.seq" in sql
+    assert session.committed is False
+
+
+def test_log_message_uses_explicit_sequence():
+    session = FakeSession(execute_value=2)
+
+    seq = ChatLogger(session).log_message(
+        chat_id=uuid.uuid4(), role="assistant", content="hello", seq=2
+    )
+
+    assert seq == 2
+    assert "max(" not in str(session.executed_stmt)
+    assert session.executed_stmt.compile().params["seq"] == 2
@@ -1,6 +1,16 @@
+import queue
+import threading
+from types import SimpleNamespace
+
 import pytest
 
-from app.services.couchdb_listener import process_change
+from app.services.couchdb_listener import (
+    SeqCheckpoint,
+    _extract_blog_slug,
+    enqueue_revalidation,
+    process_change,
+    revalidation_worker,
+)
 from app.settings import Settings
 from tests.conftest import FakeSession
 
@@ -81,6 +91,34 @@ def test_process_change_ingests_plain_doc():
     assert session.committed is False
 
 
+def test_process_change_notifies_when_doc_ingested():
+    changed = []
+
+    process_change(
+        {"doc": {"_id": "kb/keep.md", "type": "plain", "path": "kb/keep.md"}},
+        FakeSession(),
+        parser="parser",
+        ingest_fn=lambda *_args, **_kwargs: "kb/keep",
+        on_docs_changed=lambda: changed.append(True),
+    )
+
+    assert changed == [True]
+
+
+def test_process_change_does_not_notify_when_nothing_ingested():
+    changed = []
+
+    process_change(
+        {"doc": {"_id": "kb/keep.md", "type": "plain", "path": "kb/keep.md"}},
+        FakeSession(),
+        parser="parser",
+        ingest_fn=lambda *_args, **_kwargs: None,
+        on_docs_changed=lambda: changed.append(True),
+    )
+
+    assert changed == []
+
+
 def test_process_change_triggers_revalidation_for_blog_docs():
     session = FakeSession()
     revalidated = []
@@ -141,3 +179,108 @@ def test_process_change_revalidates_on_blog_deletes():
     )
 
     assert revalidated == ["gone"]
+
+
+def test_enqueue_revalidation_drops_when_queue_full():
+    revalidate_queue = queue.Queue(maxsize=1)
+
+    assert enqueue_revalidation("first", revalidate_queue=revalidate_queue) is True
+    assert enqueue_revalidation("second", revalidate_queue=revalidate_queue) is False
+    assert revalidate_queue.get_nowait() == "first"
+
+
+def test_revalidation_worker_drains_queue_until_stopped():
+    revalidate_queue = queue.Queue()
+    stop_event = threading.Event()
+    revalidated = []
+
+    def fake_revalidate(slug):
+        revalidated.append(slug)
+        if slug == "last":
+            stop_event.set()
+        if slug == "boom":
+            raise RuntimeError("endpoint down")
+
+    for slug in ("keep", "boom", None, "last"):
+        revalidate_queue.put(slug)
+
+    closed = []
+    service = SimpleNamespace(
+        revalidate_posts=fake_revalidate, close=lambda: closed.append(True)
+    )
+
+    revalidation_worker(
+        service, revalidate_queue=revalidate_queue, stop_event=stop_event
+    )
+
+    assert revalidated == ["keep", "boom", None, "last"]
+    assert closed == [True]
+
+
+class FakeSeqRepo:
+    def __init__(self):
+        self.updates = []
+
+    def update_last_seq(self, seq):
+        self.updates.append(seq)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_seq_checkpoint_flushes_every_n_changes():
+    repo = FakeSeqRepo()
+    checkpoint = SeqCheckpoint(repo, every=3, interval=60, clock=FakeClock())
+
+    for seq in ("1", "2", "3", "4"):
+        checkpoint.record(seq)
+
+    assert repo.updates == ["3"]
+    assert checkpoint.pending_seq == "4"
+
+
+def test_seq_checkpoint_flushes_after_interval():
+    repo = FakeSeqRepo()
+    clock = FakeClock()
+    checkpoint = SeqCheckpoint(repo, every=50, interval=1.0, clock=clock)
+
+    checkpoint.record("1")
+    checkpoint.maybe_flush()
+    assert repo.updates == []
+
+    clock.now = 1.5
+    checkpoint.maybe_flush()
+    checkpoint.maybe_flush()
+
+    assert repo.updates == ["1"]
+
+
+def test_seq_checkpoint_flush_is_noop_without_pending_seq():
+    repo = FakeSeqRepo()
+    checkpoint = SeqCheckpoint(repo, clock=FakeClock())
+
+    checkpoint.flush()
+
+    assert repo.updates == []
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("blog/keep.md", "keep"),
+        ("blog/keep", "keep"),
+        ("blog/nested/post.md", "nested/post"),
+        ("blog/.md", None),
+        ("blog/", None),
+        ("kb/keep.md", None),
+    ],
+)
+def test_extract_blog_slug(path, expected):
+    custom_settings = Settings(BLOG_PREFIX="blog/", KB_PREFIX="kb/")
+
+    assert _extract_blog_slug({"path": path}, settings_obj=custom_settings) == expected
@@ -4,6 +4,7 @@ from llama_index.core.base.embeddings.base import BaseEmbedding
 
 from app.models.doc import Doc
 from app.services.docs_ingester import (
+    PreparedDoc,
     chunk_text,
     ingest_all,
     ingest_doc,
@@ -132,7 +133,7 @@ def test_ingest_doc_ingests_and_replaces_existing():
         raw_doc,
         parser=object(),
         enhance_content=fake_enhance_content,
-        embed_text_fn=lambda text: [0.1, 0.2, 0.3],
+        embed_texts_fn=lambda texts: [[0.1, 0.2, 0.3] for _ in texts],
         parse_post_data_fn=fake_parse,
         chunk_text_fn=fake_chunk_text,
     )
@@ -183,7 +184,7 @@ def test_ingest_doc_sets_section_and_order_metadata():
         parse_post_data_fn=parse_fn,
         chunk_text_fn=chunk_text_fn,
         enhance_content=lambda **kwargs: kwargs["content"],
-        embed_text_fn=lambda _text: [0.0, 0.0],
+        embed_texts_fn=lambda texts: [[0.0, 0.0] for _ in texts],
     )
 
     assert len(db.added) == 2
@@ -225,7 +226,7 @@ def test_ingest_doc_sets_kb_source_and_metadata_fields():
         parse_post_data_fn=parse_fn,
         chunk_text_fn=lambda *args, **kwargs: ["kb chunk"],
         enhance_content=lambda **kwargs: kwargs["content"],
-        embed_text_fn=lambda _text: [9, 9],
+        embed_texts_fn=lambda texts: [[9, 9] for _ in texts],
     )
 
     assert result == "kb/note"
@@ -255,13 +256,40 @@ def test_ingest_doc_uses_id_when_path_missing():
         parse_post_data_fn=parse_fn,
         chunk_text_fn=lambda *args, **kwargs: ["chunk"],
         enhance_content=lambda **kwargs: kwargs["content"],
-        embed_text_fn=lambda _text: [1, 2, 3],
+        embed_texts_fn=lambda texts: [[1, 2, 3] for _ in texts],
     )
 
     assert result == raw_doc["_id"]
     assert db.added[0].slug == raw_doc["_id"]
 
 
+def test_ingest_doc_embeds_all_chunks_in_one_call():
+    db = IngestFakeSession()
+    raw_doc = {"_id": "doc-batch", "path": f"{settings.BLOG_PREFIX}batch.md"}
+    batches = []
+
+    def embed_texts_fn(texts):
+        batches.append(list(texts))
+        return [[float(i)] for i, _ in enumerate(texts)]
+
+    ingest_doc(
+        db,
+        raw_doc,
+        parser=object(),
+        enhance_content=lambda **kwargs: kwargs["content"],
+        embed_texts_fn=embed_texts_fn,
+        parse_post_data_fn=lambda *args, **kwargs: {
+            "content": "one two three",
+            "slug": "blog/batch",
+            "title": "Batch",
+        },
+        chunk_text_fn=lambda *_args, **_kwargs: ["one", "two", "three"],
+    )
+
+    assert batches == [["one", "two", "three"]]
+    assert [d.embedding for d in db.added] == [[0.0], [1.0], [2.0]]
+
+
 def test_ingest_doc_skips_failed_chunks_but_commits_success():
     db = IngestFakeSession()
     raw_doc = {"_id": "doc-456", "path": f"{settings.BLOG_PREFIX}mixed.md"}
@@ -275,17 +303,17 @@ def test_ingest_doc_skips_failed_chunks_but_commits_success():
     }
     chunker = lambda *_args, **_kwargs: ["ok", "boom"]
 
-    def embed_text_fn(text):
-        if text == "boom":
+    def embed_texts_fn(texts):
+        if "boom" in texts:
             raise RuntimeError("fail embed")
-        return ["vec"]
+        return [["vec"] for _ in texts]
 
     result = ingest_doc(
         db,
         raw_doc,
         parser=object(),
         enhance_content=lambda **kwargs: kwargs["content"],
-        embed_text_fn=embed_text_fn,
+        embed_texts_fn=embed_texts_fn,
         parse_post_data_fn=parse_fn,
         chunk_text_fn=chunker,
     )
@@ -308,7 +336,7 @@ def test_ingest_doc_returns_none_when_all_chunks_fail():
     }
     chunker = lambda *_args, **_kwargs: ["bad"]
 
-    def embed_fail(_content):
+    def embed_fail(_texts):
         raise RuntimeError("nope")
 
     result = ingest_doc(
@@ -316,7 +344,7 @@ def test_ingest_doc_returns_none_when_all_chunks_fail():
         raw_doc,
         parser=object(),
         enhance_content=lambda **kwargs: kwargs["content"],
-        embed_text_fn=embed_fail,
+        embed_texts_fn=embed_fail,
         parse_post_data_fn=parse_fn,
         chunk_text_fn=chunker,
     )
@@ -362,6 +390,28 @@ def test_ingest_all_filters_docs_and_calls_ingest():
     assert ingested == ["blog/keep.md", "kb/keep.md"]
 
 
+def test_ingest_all_prepares_concurrently_and_saves_in_order():
+    docs = {
+        f"doc-{i}": {
+            "_id": f"blog/post-{i}.md",
+            "path": f"{settings.BLOG_PREFIX}post-{i}.md",
+            "type": "plain",
+        }
+        for i in range(5)
+    }
+    parser = type("Parser", (), {"db": FakeCouchDB(docs)})()
+    db = IngestFakeSession()
+
+    def prepare_fn(doc, parser):
+        chunk = Doc(document_id=doc["_id"], content=doc["_id"])
+        return PreparedDoc(slug=doc["_id"], docs=[chunk], chunk_count=1)
+
+    ingest_all(db, parser=parser, prepare_fn=prepare_fn, max_workers=3)
+
+    assert [d.document_id for d in db.added] == [f"blog/post-{i}.md" for i in range(5)]
+    assert db.commit_calls == 5
+
+
 def test_ingest_all_deletes_marked_docs():
     docs = {
         "gone": {"_id": "blog/gone.md", "deleted": True, "type": "plain"},
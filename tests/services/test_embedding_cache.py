@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+import numpy as np
+
+from app.services.embedding_cache import EmbeddingCache, content_hash
+from tests.conftest import FakeSession
+
+
+class CacheFakeSession(FakeSession):
+    def __init__(self, rows=None):
+        super().__init__(rows=rows)
+        self.rolled_back = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+def cached_row(text, vector):
+    return content_hash(text), np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def test_embed_texts_only_embeds_misses_in_order():
+    session = CacheFakeSession(rows=[cached_row("hit", [1.0, 2.0])])
+    embedded = []
+
+    def fake_embed(texts):
+        embedded.append(texts)
+        return [[float(len(text)), 0.0] for text in texts]
+
+    cache = EmbeddingCache(lambda: session, embed_texts_fn=fake_embed)
+
+    vectors = cache.embed_texts(["miss", "hit", "longer miss", "miss"])
+
+    assert embedded == [["miss", "longer miss"]]
+    assert vectors == [[4.0, 0.0], [1.0, 2.0], [11.0, 0.0], [4.0, 0.0]]
+    assert session.executed_stmt is not None
+    assert session.committed is True
+
+
+def test_embed_texts_skips_provider_when_all_cached():
+    session = CacheFakeSession(rows=[cached_row("hit", [0.5])])
+    cache = EmbeddingCache(
+        lambda: session,
+        embed_texts_fn=lambda _texts: (_ for _ in ()).throw(RuntimeError("no")),
+    )
+
+    assert cache.embed_text("hit") == [0.5]
+    assert session.executed_stmt is None
+    assert session.committed is False
+
+
+def test_embed_texts_still_embeds_when_cache_write_fails():
+    class FailingWriteSession(CacheFakeSession):
+        def execute(self, stmt):
+            raise RuntimeError("db down")
+
+    session = FailingWriteSession()
+    cache = EmbeddingCache(lambda: session, embed_texts_fn=lambda texts: [[1.0]])
+
+    assert cache.embed_texts(["text"]) == [[1.0]]
+    assert session.rolled_back is True
+
+
+class PruneFakeSession(CacheFakeSession):
+    def __init__(self):
+        super().__init__()
+        self.deletes = 0
+
+    def query(self, *cols):
+        query = super().query(*cols)
+        session = self
+
+        def delete(synchronize_session=None):
+            session.deletes += 1
+            return 3
+
+        query.delete = delete
+        return query
+
+
+def test_prune_is_a_noop_without_retention():
+    session = PruneFakeSession()
+    cache = EmbeddingCache(lambda: session)
+
+    assert cache.prune() == 0
+    assert session.deletes == 0
+
+
+def test_prune_deletes_rows_past_retention():
+    session = PruneFakeSession()
+    cache = EmbeddingCache(lambda: session, retention=timedelta(days=30))
+
+    assert cache.prune() == 3
+    assert session.deletes == 1
+    assert session.last_query.filtered is not None
+    assert session.committed is True
+
+
+def test_maybe_prune_runs_at_most_once_per_interval():
+    now = [0.0]
+    session = PruneFakeSession()
+    cache = EmbeddingCache(
+        lambda: session,
+        retention=timedelta(days=30),
+        prune_interval=60.0,
+        clock=lambda: now[0],
+    )
+
+    cache.maybe_prune()
+    now[0] = 59.0
+    cache.maybe_prune()
+    now[0] = 60.0
+    cache.maybe_prune()
+
+    assert session.deletes == 2
@@ -0,0 +1,96 @@
+import pytest
+
+from app.services.prompt_cache import ProximityCache
+
+
+def unit(index, dim=4):
+    vec = [0.0] * dim
+    vec[index] = 1.0
+    return vec
+
+
+def test_lookup_returns_none_when_empty():
+    cache = ProximityCache(capacity=2, dim=4)
+
+    assert cache.lookup(unit(0)) is None
+
+
+def test_lookup_hits_for_near_identical_vectors():
+    cache = ProximityCache(capacity=2, dim=4)
+    cache.insert([2.0, 0.0, 0.0, 0.0], "value")
+
+    assert cache.lookup([1.0, 0.01, 0.0, 0.0], tau=0.05) == "value"
+
+
+def test_lookup_misses_when_distance_exceeds_tau():
+    cache = ProximityCache(capacity=2, dim=4)
+    cache.insert(unit(0), "value")
+
+    assert cache.lookup([1.0, 1.0, 0.0, 0.0], tau=0.05) is None
+
+
+def test_insert_evicts_least_recently_used():
+    cache = ProximityCache(capacity=2, dim=4)
+    cache.insert(unit(0), "a")
+    cache.insert(unit(1), "b")
+    cache.lookup(unit(0))  # "a" becomes most recently used
+
+    cache.insert(unit(2), "c")
+
+    assert len(cache) == 2
+    assert cache.lookup(unit(0)) == "a"
+    assert cache.lookup(unit(1)) is None
+    assert cache.lookup(unit(2)) == "c"
+
+
+def test_zero_vectors_are_ignored():
+    cache = ProximityCache(capacity=2, dim=4)
+    cache.insert([0.0] * 4, "value")
+
+    assert len(cache) == 0
+    assert cache.lookup([0.0] * 4) is None
+
+
+def test_rejects_wrong_dimension():
+    cache = ProximityCache(capacity=2, dim=4)
+
+    with pytest.raises(ValueError):
+        cache.insert([1.0, 0.0], "value")
+
+
+def test_clear_drops_all_entries():
+    cache = ProximityCache(capacity=2, dim=4)
+    cache.insert(unit(0), "a")
+
+    cache.clear()
+
+    assert cache.lookup(unit(0)) is None
+
+
+def test_lookup_only_matches_entries_in_the_same_scope():
+    cache = ProximityCache(capacity=2, dim=4)
+    cache.insert(unit(0), "wide", scope=(15, 0.25))
+
+    assert cache.lookup(unit(0), scope=(10, 0.25)) is None
+    assert cache.lookup(unit(0), scope=(15, 0.25)) == "wide"
+
+
+def test_insert_with_tau_replaces_near_duplicate_in_place():
+    cache = ProximityCache(capacity=4, dim=4)
+    cache.insert(unit(0), "old", scope="s", tau=0.05)
+
+    cache.insert([1.0, 0.01, 0.0, 0.0], "new", scope="s", tau=0.05)
+
+    assert len(cache) == 1
+    assert cache.lookup(unit(0), scope="s") == "new"
+
+
+def test_lookup_misses_once_entry_expires():
+    now = [0.0]
+    cache = ProximityCache(capacity=2, dim=4, ttl=10.0, clock=lambda: now[0])
+    cache.insert(unit(0), "value")
+
+    now[0] = 9.0
+    assert cache.lookup(unit(0)) == "value"
+    now[0] = 10.0
+    assert cache.lookup(unit(0)) is None
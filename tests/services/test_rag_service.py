@@ -76,6 +76,10 @@ class FakeColumn:
 
 
 class FakeDocModel:
+    id = FakeColumn("id")
+    slug = FakeColumn("slug")
+    title = FakeColumn("title")
+    content = FakeColumn("content")
     embedding = FakeEmbedding()
     doc_metadata = FakeColumn("metadata")
     document_id = FakeColumn("document_id")
@@ -178,15 +182,19 @@ class FakeAIClient:
 
 
 def make_doc(slug: str, content: str = "body", metadata=None, similarity: float = 0.9):
-    metadata = metadata or {}
-    doc = SimpleNamespace(
-        id=uuid.uuid4(),
-        slug=slug,
-        title=f"Title for {slug}",
-        content=content,
-        doc_metadata=metadata,
+    """Row shaped like the narrowed search query: DocResult columns + similarity."""
+    return uuid.uuid4(), slug, f"Title for {slug}", content, metadata or {}, similarity
+
+
+def search_doc_model(embedding):
+    return SimpleNamespace(
+        id="id",
+        slug="slug",
+        title="title",
+        content="content",
+        doc_metadata="metadata",
+        embedding=embedding,
     )
-    return doc, similarity
 
 
 def make_content_chunk(slug: str, content: str, title: str, metadata=None):
@@ -209,13 +217,13 @@ def test_get_relevant_documents_returns_results():
             expand_query=lambda q: calls.setdefault("query", q) or q
         ),
         embed_text_fn=lambda _q: [0.0] * 1536,
-        doc_model=SimpleNamespace(embedding=fake_embedding),
+        doc_model=search_doc_model(fake_embedding),
     )
     results = service.get_relevant_documents("hello world", limit=1, threshold=0.2)
 
     assert len(results) == 1
     assert results[0].slug == "blog/alpha"
-    assert results[0].similarity == round(rows[0][1], 4)
+    assert results[0].similarity == round(rows[0][-1], 4)
     assert calls["query"] == "hello world"
     assert fake_embedding.used_embedding == [0.0] * 1536
     assert session.last_query.limit_value == 1
@@ -228,7 +236,7 @@ def test_get_relevant_documents_invalid_embedding_raises():
         ai_client=SimpleNamespace(),
         query_expander_service=SimpleNamespace(expand_query=lambda q: q),
         embed_text_fn=lambda _q: [1.0, 2.0],
-        doc_model=SimpleNamespace(embedding=FakeEmbedding()),
+        doc_model=search_doc_model(FakeEmbedding()),
     )
 
     with pytest.raises(HTTPException) as excinfo:
@@ -237,6 +245,43 @@ def test_get_relevant_documents_invalid_embedding_raises():
     assert excinfo.value.status_code == 400
 
 
+def test_get_relevant_documents_orders_by_distance_for_hnsw():
+    session = FakeSession(rows=[make_doc("blog/alpha")])
+    fake_embedding = FakeEmbedding()
+    service = RAGService(
+        db=session,
+        ai_client=SimpleNamespace(),
+        query_expander_service=SimpleNamespace(expand_query=lambda q: q),
+        embed_text_fn=lambda _q: [0.0] * 1536,
+        doc_model=search_doc_model(fake_embedding),
+        hnsw_ef_search=40,
+    )
+
+    service.get_relevant_documents("hello", limit=50, threshold=0.2)
+
+    assert str(session.executed_stmt) == "SET LOCAL hnsw.ef_search = 50"
+    assert isinstance(session.last_query.order_expr, FakeDistance)
+
+
+def test_get_relevant_documents_uses_precomputed_embedding():
+    session = FakeSession(rows=[make_doc("blog/alpha")])
+    fake_embedding = FakeEmbedding()
+    service = RAGService(
+        db=session,
+        ai_client=SimpleNamespace(),
+        query_expander_service=SimpleNamespace(expand_query=lambda q: q),
+        embed_text_fn=lambda _q: (_ for _ in ()).throw(RuntimeError("no embed")),
+        doc_model=search_doc_model(fake_embedding),
+    )
+
+    results = service.get_relevant_documents(
+        "hello", limit=1, threshold=0.2, embedding=[0.5] * 1536
+    )
+
+    assert results[0].slug == "blog/alpha"
+    assert fake_embedding.used_embedding == [0.5] * 1536
+
+
 def test_get_relevant_documents_with_navigation_prioritizes_nav():
     regular = [
         DocResult(
@@ -256,7 +301,17 @@ def test_get_relevant_documents_with_navigation_prioritizes_nav():
         doc_metadata={"contentType": "navigation"},
         embedding=None,
     )
-    session = PortfolioFakeSession(rows=[nav_doc])
+    session = PortfolioFakeSession(
+        rows=[
+            (
+                nav_doc.id,
+                nav_doc.slug,
+                nav_doc.title,
+                nav_doc.content,
+                nav_doc.doc_metadata,
+            )
+        ]
+    )
 
     service = RAGService(
         db=session,
@@ -265,7 +320,9 @@ def test_get_relevant_documents_with_navigation_prioritizes_nav():
         query_expander_service=SimpleNamespace(expand_query=lambda q: q),
         embed_text_fn=lambda _q: [0.0] * 1536,
     )
-    service.get_relevant_documents = lambda query, limit, threshold: regular
+    service.get_relevant_documents = (
+        lambda query, limit, threshold, embedding=None: regular
+    )
 
     results = service.get_relevant_documents_with_navigation(
         "where am i", limit=2, threshold=0.1
@@ -458,7 +515,9 @@ async def test_stream_chat_response_yields_chunks_and_builds_prompt():
     assert ai_client.chat.completions.kwargs["reasoning_effort"] == settings.RAG_REASONING_EFFORT
     sent = ai_client.chat.completions.kwargs["messages"]
     assert sent[0]["role"] == "system"
-    assert "Title: Post 1" in sent[0]["content"]
+    assert "Title: Post 1" not in sent[0]["content"]
+    assert sent[-2]["role"] == "system"
+    assert "Title: Post 1" in sent[-2]["content"]
     assert sent[-1]["content"] == "What's new?"
 
 
@@ -502,3 +561,76 @@ async def test_stream_chat_response_passes_reasoning_effort():
         pass
 
     assert ai_client.chat.completions.kwargs["reasoning_effort"] == "medium"
+
+
+@pytest.mark.asyncio
+async def test_stream_chat_response_does_not_refetch_empty_docs():
+    ai_client = FakeAIClient(FakeStream(["ok"]))
+    service = RAGService(
+        db=SimpleNamespace(),
+        ai_client=ai_client,
+        query_expander_service=SimpleNamespace(expand_query=lambda q: q),
+        embed_text_fn=lambda q: [0.0] * 1536,
+        doc_model=FakeDocModel,
+    )
+    service.get_relevant_documents_with_navigation = (
+        lambda query, limit, threshold: (_ for _ in ()).throw(
+            RuntimeError("should not refetch")
+        )
+    )
+
+    messages = [ChatMessage(role="user", content="ping")]
+    tokens = [
+        token
+        async for token in service.stream_chat_response(
+            messages, limit=2, threshold=0.2, relevant_docs=[]
+        )
+    ]
+
+    assert tokens == ["ok"]
+    sent = ai_client.chat.completions.kwargs["messages"]
+    assert "No relevant context available." in sent[-2]["content"]
+
+
+@pytest.mark.asyncio
+async def test_stream_chat_response_keeps_system_prefix_stable():
+    sent_prompts = []
+    for slug in ("blog/one", "blog/two"):
+        ai_client = FakeAIClient(FakeStream(["ok"]))
+        service = RAGService(
+            db=SimpleNamespace(),
+            ai_client=ai_client,
+            query_expander_service=SimpleNamespace(expand_query=lambda q: q),
+            embed_text_fn=lambda q: [0.0] * 1536,
+            doc_model=FakeDocModel,
+        )
+        doc = DocResult(
+            id=uuid.uuid4(),
+            slug=slug,
+            title=slug,
+            content="body",
+            doc_metadata={},
+            similarity=0.8,
+        )
+        messages = [
+            ChatMessage(role="user", content="hi"),
+            ChatMessage(role="assistant", content="hello"),
+            ChatMessage(role="user", content=f"tell me about {slug}"),
+        ]
+        async for _token in service.stream_chat_response(
+            messages, limit=2, threshold=0.2, relevant_docs=[doc]
+        ):
+            pass
+        sent_prompts.append(ai_client.chat.completions.kwargs["messages"])
+
+    first, second = sent_prompts
+    assert first[:3] == second[:3]  # system prompt + history
+    assert [m["role"] for m in first] == [
+        "system",
+        "user",
+        "assistant",
+        "system",
+        "user",
+    ]
+    assert "blog/one" in first[3]["content"]
+    assert "blog/two" in second[3]["content"]
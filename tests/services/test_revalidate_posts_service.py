@@ -1,4 +1,7 @@
+import httpx
+
 from app.services.revalidate_posts import RevalidatePostsService
+from app.settings import Settings
 
 
 class FakeResponse:
@@ -17,6 +20,7 @@ class FakeClient:
         self.response = response or FakeResponse()
         self.post_exc = post_exc
         self.calls = []
+        self.closed = False
 
     def post(self, url: str, *, headers=None, json=None):
         if self.post_exc is not None:
@@ -24,6 +28,9 @@ class FakeClient:
         self.calls.append({"url": url, "headers": headers, "json": json})
         return self.response
 
+    def close(self):
+        self.closed = True
+
 
 def test_revalidate_posts_noops_when_secret_missing():
     client = FakeClient()
@@ -66,3 +73,37 @@ def test_revalidate_posts_returns_false_when_request_fails():
     )
 
     assert service.revalidate_posts("my-slug") is False
+
+
+def test_revalidate_posts_reuses_client_across_calls():
+    client = FakeClient()
+    service = RevalidatePostsService(
+        url="http://example.com/revalidate", secret="s", client=client
+    )
+
+    service.revalidate_posts("a")
+    service.revalidate_posts("b")
+    service.close()
+
+    assert [call["json"] for call in client.calls] == [{"slug": "a"}, {"slug": "b"}]
+    assert client.closed is True
+
+
+def test_from_settings_owns_a_long_lived_client():
+    service = RevalidatePostsService.from_settings(
+        Settings(REVALIDATE_POSTS_URL="http://example.com/revalidate")
+    )
+
+    assert isinstance(service._client, httpx.Client)
+    assert service._client.timeout == httpx.Timeout(5.0)
+
+    service.close()
+
+    assert service._client.is_closed is True
+
+
+def test_direct_construction_does_not_open_a_client():
+    service = RevalidatePostsService(url="http://example.com/revalidate", secret="")
+
+    assert service._client is None
+    service.close()
@@ -25,8 +25,8 @@ def test_root_endpoint_runs_lifespan(monkeypatch):
     started = []
     stopped = []
 
-    def fake_start_listener():
-        started.append(True)
+    def fake_start_listener(on_docs_changed=None):
+        started.append(on_docs_changed)
         return thread
 
     def fake_stop_listener():
@@ -40,14 +40,15 @@ def test_root_endpoint_runs_lifespan(monkeypatch):
         assert res.status_code == 200
         assert res.json() == {"message": "TACOS API is running"}
 
-    assert started == [True]
+    # Doc changes from the listener invalidate this worker's prompt cache
+    assert started == [rag_router.get_prompt_cache().clear]
     assert stopped == [True]
     assert thread.join_called is True
     assert thread.join_timeout == 10
 
 
 def test_posts_routes_enforce_api_key(monkeypatch):
-    monkeypatch.setattr(main_module, "start_listener", lambda: DummyThread())
+    monkeypatch.setattr(main_module, "start_listener", lambda **_kwargs: DummyThread())
     monkeypatch.setattr(main_module, "stop_listener", lambda: None)
 
     import app.security as security
@@ -86,7 +87,7 @@ def test_posts_routes_enforce_api_key(monkeypatch):
 
 
 def test_rag_routes_require_api_key(monkeypatch):
-    monkeypatch.setattr(main_module, "start_listener", lambda: DummyThread())
+    monkeypatch.setattr(main_module, "start_listener", lambda **_kwargs: DummyThread())
     monkeypatch.setattr(main_module, "stop_listener", lambda: None)
 
     import app.security as security